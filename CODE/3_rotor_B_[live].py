@@ -1,46 +1,89 @@
+import array
+import asyncio
+import os
+import string
+
 import ipywidgets as widgets
+import numpy as np
 from IPython.display import display
 
+# --- Constants ---
+
+_ALPHA = string.ascii_uppercase
+_ALPHA_LIST = list(_ALPHA)
+
+# Position <-> letter lookup tables: 0 <-> 'A', 1 <-> 'B', ... 25 <-> 'Z'
+_POS2LET = tuple(_ALPHA)
+_LET2POS = {ch: i for i, ch in enumerate(_ALPHA)}
+
 # --- Helper Functions ---
 
 def letter_to_pos(letter):
     """
     Convert 'A' -> 0, 'B' -> 1, ... 'Z' -> 25
     """
-    return ord(letter.upper()) - 65
+    return _LET2POS[letter.upper()]
 
 def pos_to_letter(pos):
     """
     Convert 0 -> 'A', 1 -> 'B', ... 25 -> 'Z'
     """
-    return chr((pos % 26) + 65)
+    return _POS2LET[pos % 26]
+
+def to_letter_buffer(msg):
+    """
+    Classify a whole message in a couple of C-level calls.
+    - Returns (buf, alpha_mask): buf holds the uppercased code point of each
+      character (uint32, one per character of msg), alpha_mask marks the
+      characters that are letters (str.isalpha, as the per-char code used).
+    """
+    upper = msg.upper()
+    if len(upper) != len(msg):
+        # A few letters uppercase to several chars ('ß' -> 'SS'); keep those as-is
+        upper = "".join(ch.upper() if len(ch.upper()) == 1 else ch for ch in msg)
+    buf = np.frombuffer(upper.encode('utf-32-le'), dtype=np.uint32)
+    alpha_mask = np.fromiter(map(str.isalpha, msg), dtype=bool, count=len(msg))
+    return buf, alpha_mask
+
+def encrypt_block(msg, rotor_positions, mode):
+    """
+    Encrypt or decrypt a whole message in one NumPy pass.
+    - mode is "Encrypt" (add the rotor shifts) or "Decrypt" (subtract them).
+    - Every letter steps the rotors; non-alpha characters pass through unchanged.
+    - rotor_positions is [r1, r2, r3] at the first letter and is not modified.
+    """
+    buf, alpha_mask = to_letter_buffer(msg)
+    return _encrypt_classified(msg, buf, alpha_mask, rotor_positions, mode)
+
+def _encrypt_classified(msg, buf, alpha_mask, rotor_positions, mode):
+    # encrypt_block for a message already split by to_letter_buffer(msg)
+    n_letters = int(alpha_mask.sum())
+    if n_letters == 0:
+        return msg
+
+    # Total shift S[k] = r1 + r2 + r3 before the k-th letter, in closed form
+    count = odometer_count(rotor_positions) + np.arange(n_letters, dtype=np.int64)
+    S = (count + count // 26 + count // 676) % 26
+
+    # letter_idx[i] = index of the letter at (or before) position i
+    letter_idx = np.cumsum(alpha_mask) - 1
+    sign = 1 if mode == "Encrypt" else -1
+    out = ((buf.astype(np.int64) - 65 + sign * S[letter_idx]) % 26 + 65).astype(np.uint32)
+    # Everything else is copied from the original message
+    orig = np.frombuffer(msg.encode('utf-32-le'), dtype=np.uint32)
+    return np.where(alpha_mask, out, orig).tobytes().decode('utf-32-le')
 
 def encrypt_char(ch, rotor_positions):
     """
-    Pass character 'ch' through 3 rotors in sequence (encrypting).
-    - rotor_positions[i] in [0..25]
-    - We add the shift from rotor1, then rotor2, then rotor3.
+    Encrypt a single character (see encrypt_block).
     """
-    if not ch.isalpha():
-        return ch
-    pos = letter_to_pos(ch)
-    # Forward path: rotor1 -> rotor2 -> rotor3
-    for shift in rotor_positions:
-        pos = (pos + shift) % 26
-    return pos_to_letter(pos)
+    return encrypt_block(ch, rotor_positions, "Encrypt")
 
 def decrypt_char(ch, rotor_positions):
     """
-    Pass character 'ch' backward through the 3 rotors (decrypting).
-    - We subtract the shift from rotor3, then rotor2, then rotor1.
+    Decrypt a single character (see encrypt_block).
     """
-    if not ch.isalpha():
-        return ch
-    pos = letter_to_pos(ch)
-    # Reverse path: rotor3 -> rotor2 -> rotor1
-    for shift in reversed(rotor_positions):
-        pos = (pos - shift) % 26
-    return pos_to_letter(pos)
+    return encrypt_block(ch, rotor_positions, "Decrypt")
 
 def step_rotors(rotor_positions):
     """
@@ -56,85 +99,167 @@ def step_rotors(rotor_positions):
         if rotor_positions[1] == 0:
             rotor_positions[2] = (rotor_positions[2] + 1) % 26
 
+def odometer_count(rotor_positions):
+    """
+    The rotors step like a base-26 odometer with rotor1 as the lowest digit.
+    Return [r1, r2, r3] as that single count: r1 + 26*r2 + 676*r3.
+    """
+    return rotor_positions[0] + 26 * rotor_positions[1] + 676 * rotor_positions[2]
+
+def rotor_schedule(rotor_positions, n):
+    """
+    Rotor positions for the next n letters without stepping one by one.
+    Row k of the returned (n, 3) array is [r1, r2, r3] after k steps.
+    """
+    count = odometer_count(rotor_positions) + np.arange(n, dtype=np.int64)
+    return np.stack([count % 26, count // 26 % 26, count // 676 % 26], axis=1)
+
+def advance_rotors(rotor_positions, n):
+    """
+    Step the rotors n times in place (same result as n calls to step_rotors).
+    """
+    count = odometer_count(rotor_positions) + n
+    rotor_positions[0] = count % 26
+    rotor_positions[1] = count // 26 % 26
+    rotor_positions[2] = count // 676 % 26
+
 
 # --- Widgets ---
 
-rotor1_dropdown = widgets.Dropdown(options=[chr(i) for i in range(65, 91)],
+rotor1_dropdown = widgets.Dropdown(options=_ALPHA_LIST,
                                    value='A', description="Rotor 1:")
-rotor2_dropdown = widgets.Dropdown(options=[chr(i) for i in range(65, 91)],
+rotor2_dropdown = widgets.Dropdown(options=_ALPHA_LIST,
                                    value='A', description="Rotor 2:")
-rotor3_dropdown = widgets.Dropdown(options=[chr(i) for i in range(65, 91)],
+rotor3_dropdown = widgets.Dropdown(options=_ALPHA_LIST,
                                    value='A', description="Rotor 3:")
 
 mode_dropdown = widgets.Dropdown(options=["Encrypt", "Decrypt"],
                                  value="Encrypt", description="Mode:")
 
-input_text = widgets.Text(value="", description="Input:")
+# By default the text is only sent on Enter/blur; "Live" sends every keystroke
+input_text = widgets.Text(value="", description="Input:", continuous_update=False)
+live_checkbox = widgets.Checkbox(value=False, description="Live")
 reset_button = widgets.Button(description="Reset", button_style='warning')
 output_area = widgets.Output()
 
-# We'll track the old_value of input_text to process only newly typed characters
-old_input_value = ""
-
-# We'll store the dynamic rotor positions in a list [r1, r2, r3] as 0..25
-rotor_positions = [0, 0, 0]
+# In live mode keystrokes restart a timer on the kernel's event loop, so a
+# burst is processed once (on the same thread as every other widget callback)
+LIVE_DEBOUNCE_SECONDS = 0.05
 
-def on_text_change(change):
+class RotorMachine:
     """
-    This triggers whenever input_text.value changes.
-    We process newly typed chars only.
+    State of the live simulator, kept on one object instead of module globals:
+    - positions: the dynamic rotor positions [r1, r2, r3] as 0..25, stored as
+      array.array('b') machine bytes rather than a list of boxed ints
+    - old_value: the input already processed, so only newly typed chars are handled
     """
-    global old_input_value, rotor_positions
+    __slots__ = ('positions', 'old_value', '_timer')
+
+    def __init__(self, r1, r2, r3):
+        self.positions = array.array('b', [r1, r2, r3])
+        self.old_value = ""
+        self._timer = None
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
 
-    new_value = change['new']
-    old_value = change['old']
+    def reset(self, r1, r2, r3):
+        """
+        Drop any pending live batch and start over from the given positions.
+        """
+        self._cancel_timer()
+        # Overwrite in place, so the array stays the same C-backed buffer
+        self.positions[:] = array.array('b', (r1, r2, r3))
+        self.old_value = ""
 
-    # If user typed some new characters at the end
-    if len(new_value) > len(old_value):
-        added_substring = new_value[len(old_value):]
-        current_mode = mode_dropdown.value  # "Encrypt" or "Decrypt"
-        with output_area:
-            for ch in added_substring:
+    def process_new_input(self, new_value):
+        """
+        Encrypt/decrypt whatever was typed since the last processed value.
+        One (coalesced) change can hold deletions and additions together, so
+        everything after the part shared with the old value counts as typed -
+        the same characters per-keystroke handling would have seen appended.
+        """
+        positions = self.positions
+        old_value = self.old_value
+        common = len(os.path.commonprefix((old_value, new_value)))
+
+        # If user typed some new characters at the end
+        if len(new_value) > common:
+            added_substring = new_value[common:]
+            current_mode = mode_dropdown.value  # "Encrypt" or "Decrypt"
+            # Which chars are letters, decided once for the batch (no per-char isalpha)
+            buf, alpha_mask = to_letter_buffer(added_substring)
+            is_letter = alpha_mask.tolist()
+            # Transform the whole batch at once, then log it char by char
+            out_substring = _encrypt_classified(added_substring, buf, alpha_mask,
+                                                positions, current_mode)
+            n_letters = sum(is_letter)
+            # Row k holds the rotor positions before the k-th letter (and after the last)
+            schedule = rotor_schedule(positions, n_letters + 1).tolist()
+            k = 0
+            # Collect the log for the whole batch and print it once
+            lines = []
+            for ch, out_ch, letter in zip(added_substring, out_substring, is_letter):
                 # Grab old rotor positions in letter form
-                pos_before = (pos_to_letter(rotor_positions[0]),
-                              pos_to_letter(rotor_positions[1]),
-                              pos_to_letter(rotor_positions[2]))
+                pos_before = tuple(_POS2LET[p] for p in schedule[k])
                 
-                if ch.isalpha():
-                    if current_mode == "Encrypt":
-                        out_ch = encrypt_char(ch, rotor_positions)
-                    else:
-                        out_ch = decrypt_char(ch, rotor_positions)
-                    
-                    # Print transformation
-                    print(f"{ch} (rotors {pos_before}, mode={current_mode}) -> {out_ch}", end="")
-                    
-                    # Step rotors AFTER processing a letter
-                    step_rotors(rotor_positions)
-                    
-                    # Show new positions
-                    pos_after = (pos_to_letter(rotor_positions[0]),
-                                 pos_to_letter(rotor_positions[1]),
-                                 pos_to_letter(rotor_positions[2]))
-                    print(f"  => rotors now {pos_after}")
+                if letter:
+                    # Rotors step AFTER processing a letter
+                    k += 1
+                    pos_after = tuple(_POS2LET[p] for p in schedule[k])
+                    # Log transformation and new positions
+                    lines.append(f"{ch} (rotors {pos_before}, mode={current_mode}) -> {out_ch}"
+                                 f"  => rotors now {pos_after}")
                 else:
-                    # Non-alpha, just print
-                    print(f"{ch} (no step - non-alpha)")
+                    # Non-alpha, just log
+                    lines.append(f"{ch} (no step - non-alpha)")
+            with output_area:
+                print("\n".join(lines))
+            # Commit all the steps in one go
+            advance_rotors(positions, n_letters)
+
+        self.old_value = new_value
+
+    def on_text_change(self, change):
+        """
+        This triggers whenever input_text.value changes.
+        Normally that's on Enter/blur and we process right away; in live mode
+        we wait until typing pauses for LIVE_DEBOUNCE_SECONDS.
+        """
+        self._cancel_timer()
+        if not live_checkbox.value:
+            self.process_new_input(change['new'])
+            return
+        self._timer = asyncio.get_running_loop().call_later(
+            LIVE_DEBOUNCE_SECONDS, self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        self.process_new_input(input_text.value)
 
-    old_input_value = new_value
+# Initialize the machine from the default dropdown values
+machine = RotorMachine(_LET2POS[rotor1_dropdown.value],
+                       _LET2POS[rotor2_dropdown.value],
+                       _LET2POS[rotor3_dropdown.value])
+
+def on_live_change(change):
+    """
+    Switch the text box between per-keystroke and on-Enter updates.
+    """
+    input_text.continuous_update = change['new']
 
 def on_reset_button_clicked(b):
     """
-    Reset input_text, rotor_positions, and output_area.
+    Reset input_text, the machine's rotor positions, and output_area.
     """
-    global old_input_value, rotor_positions
     # Clear input
     input_text.value = ""
-    old_input_value = ""
     # Reset rotor positions from user-chosen dropdown
-    rotor_positions[0] = letter_to_pos(rotor1_dropdown.value)
-    rotor_positions[1] = letter_to_pos(rotor2_dropdown.value)
-    rotor_positions[2] = letter_to_pos(rotor3_dropdown.value)
+    machine.reset(_LET2POS[rotor1_dropdown.value],
+                  _LET2POS[rotor2_dropdown.value],
+                  _LET2POS[rotor3_dropdown.value])
     # Clear output area
     output_area.clear_output()
 
@@ -151,20 +276,14 @@ rotor2_dropdown.observe(on_rotor_change, names='value')
 rotor3_dropdown.observe(on_rotor_change, names='value')
 mode_dropdown.observe(on_rotor_change, names='value')
 
-input_text.observe(on_text_change, names='value')
+input_text.observe(machine.on_text_change, names='value')
+live_checkbox.observe(on_live_change, names='value')
 reset_button.on_click(on_reset_button_clicked)
 
-# Initialize rotor_positions from the default dropdown values
-rotor_positions = [
-    letter_to_pos(rotor1_dropdown.value),
-    letter_to_pos(rotor2_dropdown.value),
-    letter_to_pos(rotor3_dropdown.value)
-]
-
 # Layout
 ui = widgets.VBox([
     widgets.HBox([rotor1_dropdown, rotor2_dropdown, rotor3_dropdown, mode_dropdown, reset_button]),
-    input_text,
+    widgets.HBox([input_text, live_checkbox]),
     output_area
 ])
 
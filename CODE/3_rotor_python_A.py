@@ -1,12 +1,61 @@
 # Simplified Enigma-style 3-rotor encryption/decryption simulator using ipywidgets
+import string
+from functools import lru_cache
+
 import ipywidgets as widgets
+import numpy as np
 from IPython.display import display
 
+_ALPHA = string.ascii_uppercase
+_ALPHA_LIST = list(_ALPHA)
+
+# The rotors step like a base-26 odometer (rotor 1 is the lowest digit), so the
+# positions before every letter follow in closed form from one arange.
+# Rotor positions are letters, e.g. ('A', 'A', 'A'); returns an (n, 3) array of 0..25.
+def rotor_schedule(initial_positions, n):
+    r1, r2, r3 = (ord(r) - 65 for r in initial_positions)
+    count = r1 + 26 * r2 + 676 * r3 + np.arange(n)
+    return np.stack([count % 26, count // 26 % 26, count // 676 % 26], axis=1)
+
+# str.translate table for a plain Caesar shift of A-Z (cached, at most 26 of them)
+@lru_cache(maxsize=26)
+def _caesar_table(shift):
+    return str.maketrans(_ALPHA, _ALPHA[shift:] + _ALPHA[:shift])
+
+# Same result as on_button_click's output string, without the per-character log.
+# Every letter just gets a Caesar shift, so the message is translated once per
+# distinct shift (C-level str.translate) and each letter picks its own copy.
+# Letters are what str.isalpha says, as in on_button_click; the few outside A-Z
+# (e.g. 'É') get the same arithmetic shift the UI applies to them.
+def encrypt_batch_silent(msg, initial_positions, mode="Encrypt"):
+    message = msg.upper()
+    # One uint32 per character, so positions line up with the string
+    buf = np.frombuffer(message.encode('utf-32-le'), dtype=np.uint32)
+    is_letter = np.fromiter(map(str.isalpha, message), dtype=bool, count=len(message))
+    n_letters = int(is_letter.sum())
+    if n_letters == 0:
+        return message
+    # Each rotor shifts by position + 1, hence the + 3
+    shifts = (rotor_schedule(initial_positions, n_letters).sum(axis=1) + 3) % 26
+    if mode != "Encrypt":
+        shifts = (26 - shifts) % 26
+    shift_at = np.full(len(buf), -1)
+    shift_at[is_letter] = shifts
+    out = buf.copy()
+    for shift in np.unique(shifts).tolist():
+        shifted = np.frombuffer(message.translate(_caesar_table(shift)).encode('utf-32-le'),
+                                dtype=np.uint32)
+        pick = shift_at == shift
+        out[pick] = shifted[pick]
+    other = is_letter & ((buf < 65) | (buf > 90))
+    out[other] = (buf[other].astype(np.int64) - 65 + shift_at[other]) % 26 + 65
+    return out.tobytes().decode('utf-32-le')
+
 # Create input widgets for message and rotor initial positions (A-Z) and mode
 text_input = widgets.Text(value="HELLO", description="Message:")
-rotor1_dropdown = widgets.Dropdown(options=[chr(i) for i in range(65, 91)], value='A', description="Rotor 1:")
-rotor2_dropdown = widgets.Dropdown(options=[chr(i) for i in range(65, 91)], value='A', description="Rotor 2:")
-rotor3_dropdown = widgets.Dropdown(options=[chr(i) for i in range(65, 91)], value='A', description="Rotor 3:")
+rotor1_dropdown = widgets.Dropdown(options=_ALPHA_LIST, value='A', description="Rotor 1:")
+rotor2_dropdown = widgets.Dropdown(options=_ALPHA_LIST, value='A', description="Rotor 2:")
+rotor3_dropdown = widgets.Dropdown(options=_ALPHA_LIST, value='A', description="Rotor 3:")
 mode_dropdown = widgets.Dropdown(options=["Encrypt", "Decrypt"], value="Encrypt", description="Mode:")
 button = widgets.Button(description="Run")
 output = widgets.Output()
@@ -22,10 +71,15 @@ def on_button_click(_):
         r3 = rotor3_dropdown.value
         # Convert message to uppercase (Enigma typically works on uppercase A-Z)
         message = message.upper()
-        result_chars = []  # store output characters to build final result string
+        result = bytearray()  # output bytes, decoded once into the final result string
         # Print a header for clarity
         print(f"{mode}ing message: \"{message}\"")
         print(f"Initial rotor positions: {r1}, {r2}, {r3}\n")
+        # Rotor positions before every letter (and after the last), as letters
+        n_letters = sum(1 for char in message if char.isalpha())
+        schedule = rotor_schedule((r1, r2, r3), n_letters + 1) + 65
+        schedule = [tuple(map(chr, row)) for row in schedule.tolist()]
+        step = 0
         # Process each character in the message
         for char in message:
             # If character is not A-Z, leave it unchanged and do not advance rotors
@@ -34,7 +88,7 @@ def on_button_click(_):
                     print("(space) (no change, no rotor step)")
                 else:
                     print(f"({char}) (no change, no rotor step)")
-                result_chars.append(char)
+                result += char.encode()  # usually one ASCII byte; non-ASCII as UTF-8
                 continue
             # Calculate the shift values for each rotor (A=1, B=2, ..., Z=26)
             shift1 = ord(r1) - 65 + 1  # rotor1 shift
@@ -54,29 +108,17 @@ def on_button_click(_):
                 out_char = chr((ord(mid2) - 65 - shift1) % 26 + 65)  # after rotor1 (final)
                 path_str = f"{char} -> {mid3} -> {mid2} -> {out_char}"
             # Record the output character
-            result_chars.append(out_char)
+            result.append(ord(out_char))  # always A-Z
             # Save old rotor positions for display, then step rotors for the next character
             old_positions = f"{r1},{r2},{r3}"
-            # Advance rotor 1 every time; if it wraps from Z to A, advance rotor 2, etc.
-            if r1 == 'Z':
-                r1 = 'A'
-                # Rotor 1 completed a full rotation, step rotor 2
-                if r2 == 'Z':
-                    r2 = 'A'
-                    # Rotor 2 also completed a full rotation, step rotor 3
-                    if r3 == 'Z':
-                        r3 = 'A'
-                    else:
-                        r3 = chr(ord(r3) + 1)
-                else:
-                    r2 = chr(ord(r2) + 1)
-            else:
-                r1 = chr(ord(r1) + 1)
+            # Advance to the next precomputed rotor positions
+            step += 1
+            r1, r2, r3 = schedule[step]
             new_positions = f"{r1},{r2},{r3}"
             # Print the transformation path and rotor position change for this character
             print(f"{path_str} (rotors: {old_positions} -> {new_positions})")
         # After processing all characters, print the final output string
-        output_text = "".join(result_chars)
+        output_text = result.decode()
         print(f"\nOutput: {output_text}")
 
 # Attach the event handler to the button
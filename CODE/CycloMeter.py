@@ -3,9 +3,28 @@
 # GPT Pro 
 # https://en.wikipedia.org/wiki/Marian_Rejewski
 
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+import multiprocessing
 from ipywidgets import interact, Dropdown, ToggleButtons
+import numpy as np
 import string
 
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:  # no numba: run the kernels as plain Python (same results, slower)
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda f: f
+
+_ALPHA = string.ascii_uppercase
+# Letter -> index (0..25); anything but A-Z is a KeyError, as in the dict lookups
+_LETTER_IDX = {ch: i for i, ch in enumerate(_ALPHA)}
+
 # Enigma machine components (same as before)
 
 rotor_wiring = {
@@ -14,6 +33,8 @@ rotor_wiring = {
     "III":"BDFHJLCPRTXVZNYEIWGAKMUSQO",
 }
 rotor_notch = {"I": "Q", "II": "E", "III": "V"}
+# Notch letters as positions, so stepping is a plain int compare
+NOTCH_IDX = {k: ord(v) - 65 for k, v in rotor_notch.items()}
 
 reflector_wiring = {
     "A": {
@@ -28,132 +49,291 @@ reflector_wiring = {
     }
 }
 
-plugboard_map = {ch: ch for ch in string.ascii_uppercase}
+plugboard_map = {ch: ch for ch in _ALPHA}
 
-def encrypt_letter(letter, rotor_order, rotor_positions, reflector_type="A"):
+def index_table(mapping):
+    """
+    Turn a letter -> letter dict into a uint8[26] index lookup (0..25);
+    letters not in the dict map to themselves.
+    """
+    table = np.arange(26, dtype=np.uint8)
+    for k, v in mapping.items():
+        table[ord(k) - 65] = ord(v) - 65
+    return table
+
+# Wiring as index lookup tables (0..25), built once:
+# FORWARD[r][i] is where rotor r sends contact i, INVERSE[r] undoes it.
+FORWARD = {r: np.frombuffer(s.encode(), np.uint8) - 65 for r, s in rotor_wiring.items()}
+INVERSE = {r: np.argsort(FORWARD[r]).astype(np.uint8) for r in rotor_wiring}
+REFLECTOR = {k: index_table(m) for k, m in reflector_wiring.items()}
+PLUGBOARD = index_table(plugboard_map)
+
+# The same tables packed into int8 arrays indexed by integer ids, for the
+# compiled map builder: FWD/INV[rotor_id], REFL[reflector_id].
+ROTOR_IDS = {r: i for i, r in enumerate(rotor_wiring)}
+REFLECTOR_IDS = {k: i for i, k in enumerate(reflector_wiring)}
+FWD = np.stack([FORWARD[r] for r in rotor_wiring]).astype(np.int8)
+INV = np.stack([INVERSE[r] for r in rotor_wiring]).astype(np.int8)
+REFL = np.stack([REFLECTOR[k] for k in reflector_wiring]).astype(np.int8)
+PLUG = PLUGBOARD.astype(np.int8)
+
+def set_plugboard(pairs):
+    """
+    Rewire the plugboard from letter pairs, e.g. ["AB", "CD"] (unlisted letters
+    are unplugged). Updates the tables every code path reads, in place.
+    Raises ValueError unless each pair is two distinct letters A-Z and no
+    letter is plugged twice (anything else isn't a permutation).
+    """
+    pairs = list(pairs)
+    plugged = set()
+    for pair in pairs:
+        if len(pair) != 2 or pair[0] == pair[1] or not set(pair) <= set(_ALPHA):
+            raise ValueError(f"plugboard pair {pair!r} is not two distinct letters A-Z")
+        if plugged.intersection(pair):
+            raise ValueError(f"plugboard pair {pair!r} reuses an already plugged letter")
+        plugged.update(pair)
+
+    plugboard_map.update({ch: ch for ch in _ALPHA})
+    for a, b in pairs:
+        plugboard_map[a], plugboard_map[b] = b, a
+    PLUGBOARD[:] = index_table(plugboard_map)
+    PLUG[:] = PLUGBOARD
+    # Cached permutations/cycles were built with the old wiring
+    build_map.cache_clear()
+    _cycles_cached.cache_clear()
+
+def step_positions(rotor_order, rotor_positions):
+    """
+    Apply one key press worth of Enigma stepping (incl. the double step)
+    and return the new (left, middle, right) positions.
+    """
     left_rotor, mid_rotor, right_rotor = rotor_order
     pos_left, pos_mid, pos_right = rotor_positions
 
-    # Step rotors (Enigma stepping rules)
-    if (string.ascii_uppercase[pos_mid] == rotor_notch[mid_rotor]):
+    # Step rotors (Enigma stepping rules); notches are ints, compared once each
+    mid_at_notch = pos_mid == NOTCH_IDX[mid_rotor]
+    if mid_at_notch:
         pos_left = (pos_left + 1) % 26
 
-    if (string.ascii_uppercase[pos_right] == rotor_notch[right_rotor]) or \
-       (string.ascii_uppercase[pos_mid] == rotor_notch[mid_rotor]):
+    if mid_at_notch or pos_right == NOTCH_IDX[right_rotor]:
         pos_mid = (pos_mid + 1) % 26
 
     pos_right = (pos_right + 1) % 26
 
-    def char_to_index(ch): return ord(ch) - ord('A')
-    def index_to_char(i): return chr(i + ord('A'))
+    return pos_left, pos_mid, pos_right
+
+_U26 = np.uint8(26)
+
+@njit(cache=True)
+def _wrap26(t):
+    """
+    t % 26 for t in [0, 52): one compare and one subtract instead of a division.
+    Works on ints (the compiled map builder) and stays uint8 on uint8 arrays
+    (encrypt_indices).
+    """
+    return t - (t >= 26) * _U26
+
+def encrypt_indices(idx, rotor_order, rotor_positions, reflector_type="A"):
+    """
+    Send contact index idx (0..25) through plugboard, rotors, reflector and back
+    at fixed rotor positions. idx may be a single int or a uint8 array, so one
+    call on np.arange(26) yields the whole 26-letter permutation.
+    """
+    left_rotor, mid_rotor, right_rotor = rotor_order
+    pos_left, pos_mid, pos_right = rotor_positions
 
     # Plugboard in
-    c = plugboard_map[letter]
+    idx = PLUGBOARD[idx]
+
+    # Each pass: shift into the rotor, look up the wiring, shift back out.
+    # Every sum stays below 52 (+ 26 keeps the subtraction from going
+    # negative), so _wrap26 replaces % 26.
 
     # --- Forward through rotors (Right -> Middle -> Left) ---
-    # Right rotor
-    in_idx = char_to_index(c)
-    offset = pos_right
-    wiring_str = rotor_wiring[right_rotor]
-    out_idx = (char_to_index(wiring_str[(in_idx + offset) % 26]) - offset) % 26
-
-    # Middle rotor
-    c = index_to_char(out_idx)
-    in_idx = char_to_index(c)
-    offset = pos_mid
-    wiring_str = rotor_wiring[mid_rotor]
-    out_idx = (char_to_index(wiring_str[(in_idx + offset) % 26]) - offset) % 26
-
-    # Left rotor
-    c = index_to_char(out_idx)
-    in_idx = char_to_index(c)
-    offset = pos_left
-    wiring_str = rotor_wiring[left_rotor]
-    out_idx = (char_to_index(wiring_str[(in_idx + offset) % 26]) - offset) % 26
+    idx = _wrap26(FORWARD[right_rotor][_wrap26(idx + pos_right)] + 26 - pos_right)
+    idx = _wrap26(FORWARD[mid_rotor][_wrap26(idx + pos_mid)] + 26 - pos_mid)
+    idx = _wrap26(FORWARD[left_rotor][_wrap26(idx + pos_left)] + 26 - pos_left)
 
     # --- Reflector ---
-    c = index_to_char(out_idx)
-    c = reflector_wiring[reflector_type][c]
+    idx = REFLECTOR[reflector_type][idx]
 
     # --- Back through rotors (Left -> Middle -> Right) ---
-    # Left rotor (reverse)
-    in_idx = char_to_index(c)
-    offset = pos_left
-    wiring_str = rotor_wiring[left_rotor]
-    out_idx = (wiring_str.index(chr(((in_idx + offset) % 26) + ord('A'))) - offset) % 26
-
-    # Middle rotor (reverse)
-    c = string.ascii_uppercase[out_idx]
-    in_idx = ord(c) - ord('A')
-    offset = pos_mid
-    wiring_str = rotor_wiring[mid_rotor]
-    out_idx = (wiring_str.index(chr(((in_idx + offset) % 26) + ord('A'))) - offset) % 26
-
-    # Right rotor (reverse)
-    c = string.ascii_uppercase[out_idx]
-    in_idx = ord(c) - ord('A')
-    offset = pos_right
-    wiring_str = rotor_wiring[right_rotor]
-    out_idx = (wiring_str.index(chr(((in_idx + offset) % 26) + ord('A'))) - offset) % 26
+    idx = _wrap26(INVERSE[left_rotor][_wrap26(idx + pos_left)] + 26 - pos_left)
+    idx = _wrap26(INVERSE[mid_rotor][_wrap26(idx + pos_mid)] + 26 - pos_mid)
+    idx = _wrap26(INVERSE[right_rotor][_wrap26(idx + pos_right)] + 26 - pos_right)
 
     # Plugboard out
-    c = string.ascii_uppercase[out_idx]
-    c = plugboard_map[c]
+    return PLUGBOARD[idx]
+
+def cycles_of(MAP):
+    """
+    Split a permutation of 0..25 into its cycles, e.g. [[0, 6, 23], [1], ...].
+    Visited letters are flags in a bytearray and each cycle ends on an int compare.
+    """
+    MAP = MAP.tolist()
+    seen = bytearray(26)
+    cycles = []
+    for i in range(26):
+        if seen[i]:
+            continue
+        cycle = [i]
+        seen[i] = 1
+        j = MAP[i]
+        while j != i:
+            cycle.append(j)
+            seen[j] = 1
+            j = MAP[j]
+        cycles.append(cycle)
+    return cycles
+
+@lru_cache(maxsize=1024)
+def build_map(pos_left, pos_mid, pos_right, rotor_order, reflector_type="A"):
+    """
+    The whole machine at fixed rotor positions is one permutation of 0..25:
+    MAP[i] is what contact i comes out as. Built by the compiled kernel
+    specialized for this rotor order/reflector (or, without numba, by pushing
+    np.arange(26) through every pass once); cached (read-only) per
+    positions/order/reflector.
+    """
+    if HAVE_NUMBA:
+        MAP = make_kernel(rotor_order, reflector_type)(pos_left, pos_mid, pos_right, PLUG)
+    else:
+        MAP = encrypt_indices(np.arange(26, dtype=np.uint8), rotor_order,
+                              (pos_left, pos_mid, pos_right), reflector_type)
+    MAP.flags.writeable = False
+    return MAP
+
+# --- Compiled map builder (int8 tables only) ---
+
+@lru_cache(maxsize=12)
+def make_kernel(rotor_order, reflector_type="A"):
+    """
+    Compile a map builder specialized for one rotor order and reflector
+    (6 orders x 2 reflectors, so at most 12). Their wiring rows are bound as
+    closure constants, leaving no table/id lookups in the loop; only the
+    positions and the plugboard (which set_plugboard can change) are passed in.
+    """
+    left, mid, right = (ROTOR_IDS[r] for r in rotor_order)
+    fwd_l, fwd_m, fwd_r = FWD[left], FWD[mid], FWD[right]
+    inv_l, inv_m, inv_r = INV[left], INV[mid], INV[right]
+    refl = REFL[REFLECTOR_IDS[reflector_type]]
+
+    # Closures over arrays can't go in numba's on-disk cache, hence no cache=True
+    @njit
+    def kernel(pos_left, pos_mid, pos_right, plug):
+        MAP = np.empty(26, np.uint8)
+        for i in range(26):
+            idx = plug[i]
+            idx = _wrap26(fwd_r[_wrap26(idx + pos_right)] + 26 - pos_right)
+            idx = _wrap26(fwd_m[_wrap26(idx + pos_mid)] + 26 - pos_mid)
+            idx = _wrap26(fwd_l[_wrap26(idx + pos_left)] + 26 - pos_left)
+            idx = refl[idx]
+            idx = _wrap26(inv_l[_wrap26(idx + pos_left)] + 26 - pos_left)
+            idx = _wrap26(inv_m[_wrap26(idx + pos_mid)] + 26 - pos_mid)
+            idx = _wrap26(inv_r[_wrap26(idx + pos_right)] + 26 - pos_right)
+            MAP[i] = plug[idx]
+        return MAP
+
+    return kernel
+
+# --- Letters and cycles ---
+
+def encrypt_letter(letter, rotor_order, rotor_positions, reflector_type="A"):
+    """
+    Press one key: step the rotors, then look the letter up in the machine's
+    permutation at the new positions.
+    """
+    positions = step_positions(rotor_order, tuple(rotor_positions))
+    MAP = build_map(*positions, tuple(rotor_order), reflector_type)
 
     # Return encrypted letter + new rotor positions
-    return c, (pos_left, pos_mid, pos_right)
+    return _ALPHA[MAP[_LETTER_IDX[letter]]], positions
 
 def get_cycle_structure(rotor_order, start_positions, reflector_type="A"):
     """
     Compute the cycle structure for the double-encryption mapping (like Rejewski’s cyclometer).
     Returns a list of cycles, where each cycle is a list of letters [A, G, X, A].
     """
+    # The rotor positions at each of the 4 indicator presses don't depend on
+    # which letter is pressed; the letter -> letter mapping is the 4th press.
+    positions = tuple(start_positions)
+    for _ in range(4):
+        positions = step_positions(rotor_order, positions)
+    MAP = build_map(*positions, tuple(rotor_order), reflector_type)
+
+    # Letters of each cycle, with the first letter repeated to close the loop
     cycles = []
-    seen = set()
-
-    for letter in string.ascii_uppercase:
-        if letter in seen:
-            continue
-        cycle = []
-        start_letter = letter
-        current_letter = letter
-
-        # For each new letter that hasn't yet appeared in any cycle:
-        while True:
-            # Step 1: Press the letter (1st of the 4-letter indicator)
-            _, (pos_left1, pos_mid1, pos_right1) = encrypt_letter(
-                current_letter, rotor_order, start_positions, reflector_type)
-
-            # Steps 2 & 3: Press two dummy letters to replicate the Enigma stepping
-            dummy = 'A'
-            _, (pos_left2, pos_mid2, pos_right2) = encrypt_letter(
-                dummy, rotor_order, (pos_left1, pos_mid1, pos_right1), reflector_type)
-            _, (pos_left3, pos_mid3, pos_right3) = encrypt_letter(
-                dummy, rotor_order, (pos_left2, pos_mid2, pos_right2), reflector_type)
-
-            # Step 4: Press the same letter again (4th of the indicator)
-            output_letter, _ = encrypt_letter(
-                current_letter, rotor_order, (pos_left3, pos_mid3, pos_right3), reflector_type)
-
-            cycle.append(current_letter)
-            seen.add(current_letter)
-            current_letter = output_letter
-
-            if current_letter == start_letter:
-                cycle.append(current_letter)  # close the loop
-                break
-            else:
-                # Reset rotor positions to the *original* start positions
-                # so each mapping is consistent with how the cyclometer sees letter→letter
-                # as a pure permutation from 1st to 4th letter of the indicator
-                continue
+    for cycle in cycles_of(MAP):
+        cycle = [_ALPHA[i] for i in cycle]
+        cycle.append(cycle[0])
         cycles.append(cycle)
     return cycles
 
+@lru_cache(maxsize=4096)
+def _cycles_cached(rotor_order, start_positions, reflector_type):
+    """
+    Memoized get_cycle_structure for the UI (widgets fire on every change and
+    users flip back and forth). Arguments must be tuples; cycles come back as
+    tuples so the cached value can't be modified by the caller.
+    """
+    cycles = get_cycle_structure(rotor_order, start_positions, reflector_type)
+    return tuple(tuple(cyc) for cyc in cycles)
+
+def indicator_permutation(rotor_order, start_positions, reflector_type="A"):
+    """
+    Rejewski's AD: the 1st indicator press's letter -> letter map followed by
+    the 4th's (x -> D[A[x]]), as a permutation of 0..25. A single press's map
+    is always thirteen 2-cycles; the cycle lengths of AD vary with the key.
+    """
+    positions = tuple(start_positions)
+    presses = []
+    for _ in range(4):
+        positions = step_positions(rotor_order, positions)
+        presses.append(positions)
+    A = build_map(*presses[0], tuple(rotor_order), reflector_type)
+    D = build_map(*presses[3], tuple(rotor_order), reflector_type)
+    return D[A]
+
+def cycle_signature(MAP):
+    """
+    Cycle lengths of a permutation, longest first - the part of the cycle
+    structure that Rejewski's catalog is indexed by.
+    """
+    return tuple(sorted(map(len, cycles_of(MAP)), reverse=True))
+
+def _catalog_worker(args):
+    # One task per left-rotor position (676 keys) keeps pickling overhead low
+    rotor_order, pos_left, reflector_type = args
+    return [
+        ((pos_left, pos_mid, pos_right),
+         cycle_signature(indicator_permutation(rotor_order, (pos_left, pos_mid, pos_right),
+                                               reflector_type)))
+        for pos_mid in range(26) for pos_right in range(26)
+    ]
+
+def build_catalog(rotor_order, reflector_type="A", max_workers=None, mp_context=None):
+    """
+    AD cycle signature (see indicator_permutation) for all 26^3 start positions
+    of one rotor order, computed in parallel worker processes.
+    Returns {(left, middle, right): signature}.
+    Run as a notebook script, _catalog_worker lives in __main__, which spawn/
+    forkserver workers can't import; so by default the pool forks (which also
+    hands the workers the current plugboard). Where fork isn't available
+    (Windows), import build_catalog from this module instead.
+    """
+    if mp_context is None and "fork" in multiprocessing.get_all_start_methods():
+        mp_context = multiprocessing.get_context("fork")
+    tasks = [(tuple(rotor_order), pos_left, reflector_type) for pos_left in range(26)]
+    catalog = {}
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context) as pool:
+        for entries in pool.map(_catalog_worker, tasks):
+            catalog.update(entries)
+    return catalog
+
 # Create interactive UI
 
 rotor_options = ["I", "II", "III"]
-position_choices = [(ch, i) for i, ch in enumerate(string.ascii_uppercase)]
+position_choices = [(ch, i) for i, ch in enumerate(_ALPHA)]
 reflector_options = ["A", "B"]
 
 left_dropdown   = Dropdown(options=rotor_options, value="I", description="Left Rotor")
@@ -176,33 +356,31 @@ def display_cycles(left_rotor, middle_rotor, right_rotor,
     rotor_order = (left_rotor, middle_rotor, right_rotor)
     start_positions = (left_pos, middle_pos, right_pos)
 
-    cycles = get_cycle_structure(rotor_order, start_positions, reflector)
+    cycles = _cycles_cached(rotor_order, start_positions, reflector)
 
     # Sort cycles by their first letter so they have a consistent order
     # (skip the repeated last element in the sort key)
     cycles_sorted = sorted(cycles, key=lambda cyc: cyc[0])
 
-    # Print info
-    print(f"**Rotor Order:** {left_rotor}-{middle_rotor}-{right_rotor}")
-    print(f"**Start Positions:** {string.ascii_uppercase[left_pos]} "
-          f"{string.ascii_uppercase[middle_pos]} {string.ascii_uppercase[right_pos]}")
-    print(f"**Reflector:** {reflector}")
-    print()
+    # Build the whole report and print it once (one Output widget update)
+    lines = [
+        f"**Rotor Order:** {left_rotor}-{middle_rotor}-{right_rotor}",
+        f"**Start Positions:** {_ALPHA[left_pos]} {_ALPHA[middle_pos]} {_ALPHA[right_pos]}",
+        f"**Reflector:** {reflector}",
+        "",
+    ]
 
     # List-like visualization: one cycle per line
-    for i, cyc in enumerate(cycles_sorted, start=1):
-        # cyc includes last letter repeated, e.g. [A, G, X, A]
-        # Let’s separate out the repeated letter
-        cycle_body = cyc[:-1]  # all but the last repeated element
-        cycle_str = " -> ".join(cycle_body) + f" -> {cyc[-1]}"
-        # length is the number of transitions (which is len(cyc_body))
-        length = len(cycle_body)
-        print(f"Cycle {i}: {cycle_str}  (length = {length})")
+    # cyc includes last letter repeated, e.g. [A, G, X, A]; its length is
+    # the number of transitions, len(cyc) - 1
+    lines.extend(f"Cycle {i}: {' -> '.join(cyc[:-1])} -> {cyc[-1]}  (length = {len(cyc) - 1})"
+                 for i, cyc in enumerate(cycles_sorted, start=1))
 
     # Summarize cycle lengths
     cycle_lengths = [len(cyc) - 1 for cyc in cycles]
-    print()
-    print("**Cycle lengths:**", cycle_lengths, f"(sum={sum(cycle_lengths)})")
+    lines.append("")
+    lines.append(f"**Cycle lengths:** {cycle_lengths} (sum={sum(cycle_lengths)})")
+    print("\n".join(lines))
 
 interact(
     display_cycles,